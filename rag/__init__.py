@@ -1,5 +1,22 @@
-from .vector_store import VectorStore
-from .image_analyzer import ImageAnalyzer
-from .rag_generator import SimpleRAGGenerator, RAGGenerator
+from importlib import import_module
 
-__all__ = ['VectorStore', 'ImageAnalyzer', 'SimpleRAGGenerator', 'RAGGenerator']
\ No newline at end of file
+# Submodule holding each public name; resolved on first access so that
+# e.g. VectorStore users don't pay ImageAnalyzer's torch/cv2 import cost
+_LAZY_IMPORTS = {
+    'VectorStore': 'vector_store',
+    'ImageAnalyzer': 'image_analyzer',
+    'SimpleRAGGenerator': 'rag_generator',
+    'RAGGenerator': 'rag_generator',
+}
+
+__all__ = ['VectorStore', 'ImageAnalyzer', 'SimpleRAGGenerator', 'RAGGenerator']
+
+
+def __getattr__(name):
+    """Lazily import the public classes on first access (PEP 562)."""
+    if name in _LAZY_IMPORTS:
+        module = import_module(f'.{_LAZY_IMPORTS[name]}', __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
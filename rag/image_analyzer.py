@@ -3,13 +3,18 @@ Advanced image analysis using YOLO for object detection
 and ResNet for room classification.
 """
 
-import torch
-import torchvision.transforms as transforms
-from PIL import Image
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from pathlib import Path
 from typing import Dict, List, Tuple
-import cv2
+
+# torch and cv2 are imported inside the methods that need them: they
+# cost seconds and hundreds of MB at import, which callers that never
+# touch image analysis shouldn't pay
 
 
 class ImageAnalyzer:
@@ -20,14 +25,20 @@ class ImageAnalyzer:
         Args:
             use_yolo: Whether to use YOLO (requires ultralytics package)
         """
+        import torch
+
         self.use_yolo = use_yolo
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
 
+        # Serializes YOLO calls when analyses run on worker threads
+        self._yolo_lock = threading.Lock()
+
         # Load YOLO model if available
         if use_yolo:
             try:
                 from ultralytics import YOLO
-                self.yolo_model = YOLO('yolov8n.pt')  # Nano model for speed
+                self.yolo_model = self._load_yolo_model(YOLO)
+                self._warmup_yolo()
                 print("YOLO model loaded successfully")
             except ImportError:
                 print("Warning: ultralytics not installed. Using fallback detection.")
@@ -45,6 +56,98 @@ class ImageAnalyzer:
             'basement': ['storage boxes', 'furnace', 'water heater']
         }
 
+        # Flattened keyword lookup built once, so classification is a
+        # single pass over the signature keywords instead of a nested
+        # room x object x signature loop per call. Some keywords (sink,
+        # chair, lamp...) belong to several rooms, hence the lists.
+        self._sig_to_rooms = {}
+        for room_type, signature in self.room_signatures.items():
+            for sig_obj in signature:
+                self._sig_to_rooms.setdefault(sig_obj, []).append(room_type)
+
+    def _load_yolo_model(self, YOLO):
+        """
+        Load the YOLO model, preferring a TensorRT FP16 engine on GPU.
+
+        The engine is exported once and cached on disk; TensorRT fuses
+        layers and FP16 roughly doubles throughput on Tensor-Core GPUs.
+        Falls back to the plain PyTorch weights if export fails or no
+        GPU is available.
+        """
+        import torch
+
+        if self.device == 'cuda':
+            engine_path = Path('yolov8n.engine')
+            try:
+                if not engine_path.exists():
+                    self._export_engine(YOLO)
+                return YOLO(str(engine_path))
+            except Exception as e:
+                print(f"Warning: TensorRT engine unavailable ({e}). Using PyTorch model.")
+
+        model = YOLO('yolov8n.pt')  # Nano model for speed
+
+        if self.device == 'cuda':
+            try:
+                # NHWC layout feeds Tensor-Core-friendly convolution
+                # kernels on Ampere+ GPUs
+                model.model = model.model.to(memory_format=torch.channels_last)
+            except Exception:
+                pass
+
+        # Without TensorRT, compiling the eager graph still buys up to
+        # ~30% at inference. Compilation can fail on dynamic control
+        # flow or older torch builds, so fall back to eager quietly.
+        if hasattr(torch, 'compile'):
+            eager_module = model.model
+            try:
+                model.model = torch.compile(eager_module, mode='reduce-overhead')
+                # torch.compile is lazy: errors only surface on the
+                # first forward pass, so run one now and restore the
+                # eager module if compilation can't actually execute
+                model(np.zeros((640, 640, 3), dtype=np.uint8))
+            except Exception:
+                model.model = eager_module
+
+        return model
+
+    def _export_engine(self, YOLO):
+        """
+        Export yolov8n.pt to a TensorRT engine, preferring INT8.
+
+        INT8 roughly doubles throughput over FP16 on GPUs with INT8
+        tensor cores, but needs a calibration dataset; drop a dataset
+        config at models/calib.yaml (pointing at representative room
+        photos) to enable it. Without one, or if calibration fails,
+        the export falls back to FP16.
+        """
+        calib_config = Path('models/calib.yaml')
+        if calib_config.exists():
+            try:
+                YOLO('yolov8n.pt').export(
+                    format='engine', int8=True, data=str(calib_config),
+                    dynamic=True, batch=16, imgsz=640
+                )
+                return
+            except Exception as e:
+                print(f"Warning: INT8 export failed ({e}). Falling back to FP16.")
+
+        YOLO('yolov8n.pt').export(
+            format='engine', half=True, dynamic=True,
+            batch=16, imgsz=640
+        )
+
+    def _warmup_yolo(self):
+        """
+        Run one dummy inference at init so the first real request
+        doesn't pay the CUDA graph / engine build cost.
+        """
+        try:
+            dummy = np.zeros((640, 640, 3), dtype=np.uint8)
+            self.yolo_model(dummy)
+        except Exception:
+            pass  # Warmup is best-effort; real calls still work
+
     def analyze_image(self, image_path: str) -> Dict:
         """
         Analyze an image and return room type, objects, and features.
@@ -59,39 +162,136 @@ class ImageAnalyzer:
         if not image_path.exists():
             raise FileNotFoundError(f"Image not found: {image_path}")
 
-        # Load image
-        image = Image.open(image_path).convert('RGB')
+        import cv2
+
+        # Decode once into a BGR array; every analysis step reads this
+        # buffer directly instead of re-copying a PIL image
+        img_bgr = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+        if img_bgr is None:
+            raise ValueError(f"Could not decode image: {image_path}")
 
-        # Detect objects
-        detected_objects = self._detect_objects(image)
+        # Detect objects, then classify room type / extract colors /
+        # analyze features from the same buffer
+        detected_objects = self._detect_objects(img_bgr)
+        return self._build_result(image_path, img_bgr, detected_objects)
 
-        # Classify room type
-        room_type = self._classify_room(detected_objects)
+    def analyze_images_batch(self, image_paths: List[str], batch_size: int = 16) -> List[Dict]:
+        """
+        Analyze multiple images, batching YOLO inference into single calls.
 
-        # Extract color palette
-        colors = self._extract_colors(image)
+        Batching keeps the GPU busy instead of paying per-image launch
+        overhead; batch_size is capped at 16 since larger batches show
+        diminishing returns.
 
-        # Analyze image quality/features
-        features = self._analyze_features(image)
+        Args:
+            image_paths: Paths to image files
+            batch_size: Maximum number of images per YOLO forward pass
 
+        Returns:
+            List of analysis dictionaries, one per image, in input order
+        """
+        paths = [Path(p) for p in image_paths]
+        for path in paths:
+            if not path.exists():
+                raise FileNotFoundError(f"Image not found: {path}")
+
+        import cv2
+
+        # Preload all images up front so the detection pass isn't
+        # interleaved with disk I/O
+        images = []
+        for path in paths:
+            img_bgr = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if img_bgr is None:
+                raise ValueError(f"Could not decode image: {path}")
+            images.append(img_bgr)
+
+        # Run the GPU pass for every image first, then do the cheaper
+        # CPU postprocessing (room type, colors, features) across a
+        # thread pool; cv2/numpy release the GIL so this scales with cores
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            if self.use_yolo:
+                detections = self._detect_with_yolo_batch(images, batch_size)
+            else:
+                detections = list(executor.map(self._detect_fallback, images))
+
+            results = list(executor.map(self._build_result, paths, images, detections))
+
+        return results
+
+    def _build_result(self, path: Path, img_bgr: np.ndarray,
+                      detected_objects: List[str]) -> Dict:
+        """Assemble the analysis dictionary for one decoded image."""
         return {
-            'room_type': room_type,
+            'room_type': self._classify_room(detected_objects),
             'detected_objects': detected_objects,
-            'dominant_colors': colors,
-            'features': features,
-            'image_path': str(image_path)
+            'dominant_colors': self._extract_colors(img_bgr),
+            'features': self._analyze_features(img_bgr),
+            'image_path': str(path)
         }
 
-    def _detect_objects(self, image: Image.Image) -> List[str]:
+    def _detect_with_yolo_batch(self, images: List[np.ndarray], batch_size: int) -> List[List[str]]:
+        """Detect objects in several BGR images with batched YOLO calls."""
+        import torch
+
+        detections = []
+
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            if self.device == 'cuda':
+                # Stage the chunk in pinned host memory so the
+                # host-to-device copy runs asynchronously
+                chunk = self._pack_batch_pinned(chunk)
+            with self._yolo_lock, torch.inference_mode():
+                results = self.yolo_model(chunk, batch=batch_size, device=self.device)
+
+            for result in results:
+                detected = []
+                for box in result.boxes:
+                    cls = int(box.cls[0])
+                    conf = float(box.conf[0])
+                    if conf > 0.5:  # Confidence threshold
+                        detected.append(result.names[cls])
+                detections.append(list(set(detected)))
+
+        return detections
+
+    def _pack_batch_pinned(self, images: List[np.ndarray]) -> 'torch.Tensor':
+        """
+        Resize a chunk of BGR images to YOLO's input size and pack them
+        into a pinned tensor; pinned + non_blocking transfers overlap
+        the copy with GPU compute instead of stalling on pageable memory.
+        """
+        import cv2
+        import torch
+
+        batch = torch.empty((len(images), 3, 640, 640), pin_memory=True)
+
+        for i, img_bgr in enumerate(images):
+            resized = cv2.resize(img_bgr, (640, 640), interpolation=cv2.INTER_LINEAR)
+            # Tensor inputs bypass ultralytics preprocessing, so convert
+            # to RGB CHW floats in [0, 1] here
+            rgb = np.ascontiguousarray(resized[:, :, ::-1].transpose(2, 0, 1))
+            batch[i] = torch.from_numpy(rgb).float().div_(255.0)
+
+        return batch.to('cuda', non_blocking=True)
+
+    def _detect_objects(self, img_bgr: np.ndarray) -> List[str]:
         """Detect objects in image using YOLO or fallback method."""
         if self.use_yolo:
-            return self._detect_with_yolo(image)
+            return self._detect_with_yolo(img_bgr)
         else:
-            return self._detect_fallback(image)
+            return self._detect_fallback(img_bgr)
 
-    def _detect_with_yolo(self, image: Image.Image) -> List[str]:
+    def _detect_with_yolo(self, img_bgr: np.ndarray) -> List[str]:
         """Detect objects using YOLO model."""
-        results = self.yolo_model(image)
+        import torch
+
+        # ultralytics expects numpy input in OpenCV's BGR order, so the
+        # decoded array goes straight in without a conversion copy.
+        # inference_mode() skips autograd bookkeeping entirely.
+        with self._yolo_lock, torch.inference_mode():
+            results = self.yolo_model(img_bgr)
         detected = []
 
         for result in results:
@@ -105,85 +305,102 @@ class ImageAnalyzer:
 
         return list(set(detected))  # Remove duplicates
 
-    def _detect_fallback(self, image: Image.Image) -> List[str]:
+    def _detect_fallback(self, img_bgr: np.ndarray) -> List[str]:
         """Fallback object detection based on simple heuristics."""
-        # Convert to numpy array
-        img_array = np.array(image)
+        import cv2
 
         # Simple heuristics based on image analysis
         detected = []
 
+        # Per-channel means in one SIMD pass (array is BGR); overall
+        # brightness derives from them rather than a second full sweep
+        avg_b, avg_g, avg_r, _ = cv2.mean(img_bgr)
+        brightness = (avg_b + avg_g + avg_r) / 3
+
         # Analyze brightness
-        brightness = np.mean(img_array)
         if brightness < 100:
             detected.append('dim lighting')
 
         # Check aspect ratio for fixtures
-        height, width = img_array.shape[:2]
+        height, width = img_bgr.shape[:2]
         aspect = width / height
 
         if aspect > 1.5:
             detected.append('horizontal fixtures')
 
-        # Color analysis for common features
-        avg_color = np.mean(img_array, axis=(0, 1))
-
         # White/light colors suggest bathroom/kitchen
-        if avg_color[0] > 200 and avg_color[1] > 200 and avg_color[2] > 200:
+        if avg_r > 200 and avg_g > 200 and avg_b > 200:
             detected.extend(['white surfaces', 'clean space'])
 
         # Brown tones suggest wood/flooring
-        if avg_color[0] > 100 and avg_color[1] > 80 and avg_color[2] < 70:
+        if avg_r > 100 and avg_g > 80 and avg_b < 70:
             detected.append('wood elements')
 
         return detected if detected else ['general room features']
 
     def _classify_room(self, detected_objects: List[str]) -> str:
         """Classify room type based on detected objects."""
-        scores = {}
-
-        for room_type, signature in self.room_signatures.items():
-            score = 0
-            for obj in detected_objects:
-                if any(sig_obj in obj.lower() for sig_obj in signature):
-                    score += 1
-            scores[room_type] = score
-
-        if max(scores.values()) == 0:
+        # Pre-seed with zeros in declaration order so ties resolve to
+        # the first room in room_signatures rather than set/hash order
+        scores = Counter(dict.fromkeys(self.room_signatures, 0))
+
+        for obj in detected_objects:
+            obj_lower = obj.lower()
+            # Each object counts at most once per room, as before
+            matched_rooms = {
+                room_type
+                for sig_obj, room_types in self._sig_to_rooms.items()
+                if sig_obj in obj_lower
+                for room_type in room_types
+            }
+            scores.update(matched_rooms)
+
+        # Single selection pass; the Counter is pre-seeded with every
+        # room, so a zero top count means no signature matched at all
+        room_type, count = scores.most_common(1)[0]
+        if count == 0:
             return 'unknown'
 
-        return max(scores, key=scores.get)
+        return room_type
 
-    def _extract_colors(self, image: Image.Image, n_colors: int = 5) -> List[Tuple[int, int, int]]:
+    def _extract_colors(self, img_bgr: np.ndarray, n_colors: int = 5) -> List[Tuple[int, int, int]]:
         """Extract dominant colors from image."""
-        # Resize for faster processing
-        image_small = image.resize((150, 150))
-        img_array = np.array(image_small)
+        import cv2
+
+        # Resize for faster processing; 64x64 is plenty to pick a
+        # dominant palette
+        img_small = cv2.resize(img_bgr, (64, 64), interpolation=cv2.INTER_LINEAR)
 
         # Reshape to list of pixels
-        pixels = img_array.reshape(-1, 3)
+        pixels = np.float32(img_small.reshape(-1, 3))
 
-        # Simple k-means clustering (manual implementation)
-        from sklearn.cluster import KMeans
-        kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
-        kmeans.fit(pixels)
+        # Single-pass k-means via OpenCV (tight C++ loop, much faster
+        # than sklearn's restart-heavy implementation)
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
+        _, _, centers = cv2.kmeans(
+            pixels, n_colors, None, criteria, 1, cv2.KMEANS_RANDOM_CENTERS
+        )
 
-        colors = kmeans.cluster_centers_.astype(int)
+        # Centers come back in BGR order; flip to RGB for callers
+        colors = np.rint(centers).astype(np.uint8)[:, ::-1]
         return [tuple(color) for color in colors]
 
-    def _analyze_features(self, image: Image.Image) -> Dict:
+    def _analyze_features(self, img_bgr: np.ndarray) -> Dict:
         """Analyze image features like lighting, space, condition."""
-        img_array = np.array(image)
+        import cv2
 
-        # Brightness analysis
-        brightness = np.mean(img_array)
+        # Convert to grayscale once; brightness, contrast and sharpness
+        # all read from the same buffer instead of re-walking the color array
+        gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
 
-        # Contrast analysis
-        contrast = np.std(img_array)
+        # Brightness and contrast in a single fused pass
+        mean, std = cv2.meanStdDev(gray)
+        brightness = mean[0][0]
+        contrast = std[0][0]
 
-        # Sharpness (using Laplacian variance)
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+        # Sharpness (using Laplacian variance; CV_32F is cheaper than
+        # CV_64F and precise enough for a variance threshold)
+        sharpness = cv2.Laplacian(gray, cv2.CV_32F).var()
 
         return {
             'brightness': 'bright' if brightness > 150 else 'dim' if brightness < 100 else 'moderate',
@@ -196,17 +413,20 @@ class ImageAnalyzer:
 def analyze_room_batch(image_paths: List[str]) -> List[Dict]:
     """Analyze multiple room images."""
     analyzer = ImageAnalyzer(use_yolo=False)
-    results = []
 
-    for path in image_paths:
-        try:
-            result = analyzer.analyze_image(path)
-            results.append(result)
-        except Exception as e:
-            print(f"Error analyzing {path}: {e}")
-            results.append({'error': str(e), 'image_path': path})
-
-    return results
+    try:
+        return analyzer.analyze_images_batch(image_paths)
+    except Exception:
+        # One bad image shouldn't sink the whole batch; retry per-image
+        # so the failing paths get error entries instead
+        results = []
+        for path in image_paths:
+            try:
+                results.append(analyzer.analyze_image(path))
+            except Exception as e:
+                print(f"Error analyzing {path}: {e}")
+                results.append({'error': str(e), 'image_path': path})
+        return results
 
 
 if __name__ == "__main__":